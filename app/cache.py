@@ -0,0 +1,293 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+CACHE_URL = os.getenv("CACHE_URL", "memory://")
+CACHE_TTL = int(os.getenv("CACHE_TTL", "60"))
+CACHE_MAX_SIZE = int(os.getenv("CACHE_MAX_SIZE", "10000"))
+CACHE_PREFIX = os.getenv("CACHE_PREFIX", "todo:")
+CACHE_PERMISSION_TTL = int(os.getenv("CACHE_PERMISSION_TTL", "5"))
+
+MISSING = object()
+
+
+def task_key(task_id: int):
+    return f"task:{task_id}"
+
+
+def visible_tasks_key(user_id: int):
+    return f"user:{user_id}:visible_tasks"
+
+
+def permission_key(task_id: int, user_id: int):
+    return f"permission:{task_id}:{user_id}"
+
+
+# Каждый ключ имеет версию, которая увеличивается при инвалидации.
+# Значение записывается вместе с версией, прочитанной до загрузки из БД,
+# и считается действительным только пока версия ключа не изменилась.
+# Так загрузка, завершившаяся после инвалидации, не вернёт в кэш устаревшие данные.
+
+
+class LRUBackend:
+    """Кэш в памяти процесса с вытеснением по LRU и TTL.
+    Инвалидация видна только текущему процессу, поэтому бэкенд
+    подходит лишь для запуска с одним воркером."""
+
+    def __init__(self, max_size: int = CACHE_MAX_SIZE):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        # Версии хранятся только для max_size последних инвалидированных ключей.
+        # Версии выдаются из общего возрастающего счётчика; при вытеснении версии
+        # _floor поднимается до её значения и служит версией всех неотслеживаемых ключей,
+        # поэтому загрузка, начатая до вытеснения, не пройдёт проверку версии.
+        self._versions = OrderedDict()
+        self._counter = 0
+        self._floor = 0
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: list):
+        now = time.monotonic()
+        result = []
+        with self._lock:
+            for key in keys:
+                version = self._versions.get(key, self._floor)
+                item = self._data.get(key)
+                if item is None or item[1] != version or item[2] < now:
+                    result.append((MISSING, version))
+                    continue
+                self._data.move_to_end(key)
+                result.append((item[0], version))
+        return result
+
+    def set_many(self, items: dict, ttl: int):
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            for key, (value, version) in items.items():
+                if self._versions.get(key, self._floor) != version:
+                    continue
+                self._data[key] = (value, version, expires_at)
+                self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, keys: list):
+        with self._lock:
+            for key in keys:
+                self._counter += 1
+                self._versions[key] = self._counter
+                self._versions.move_to_end(key)
+                self._data.pop(key, None)
+            while len(self._versions) > self.max_size:
+                _, version = self._versions.popitem(last=False)
+                self._floor = max(self._floor, version)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._versions.clear()
+            self._floor = self._counter
+
+
+class RedisBackend:
+    """Кэш в Redis (или любом сервере с протоколом Redis), значения хранятся в JSON.
+    Все ключи начинаются с префикса, clear() удаляет только их."""
+
+    def __init__(self, client, prefix: str = CACHE_PREFIX, version_ttl: int = CACHE_TTL * 10):
+        self.client = client
+        self.prefix = prefix
+        self.version_ttl = version_ttl
+
+    @classmethod
+    def from_url(cls, url: str):
+        import redis
+
+        return cls(redis.Redis.from_url(url))
+
+    def _value_key(self, key: str):
+        return f"{self.prefix}{key}"
+
+    def _version_key(self, key: str):
+        return f"{self.prefix}version:{key}"
+
+    def get_many(self, keys: list):
+        if not keys:
+            return []
+        raw = self.client.mget(
+            [self._value_key(key) for key in keys]
+            + [self._version_key(key) for key in keys]
+        )
+        result = []
+        for raw_value, raw_version in zip(raw[:len(keys)], raw[len(keys):]):
+            version = int(raw_version or 0)
+            if raw_value is None:
+                result.append((MISSING, version))
+                continue
+            stored_version, value = json.loads(raw_value)
+            result.append((value if stored_version == version else MISSING, version))
+        return result
+
+    def set_many(self, items: dict, ttl: int):
+        pipe = self.client.pipeline(transaction=False)
+        for key, (value, version) in items.items():
+            pipe.set(self._value_key(key), json.dumps([version, value]), ex=ttl)
+        pipe.execute()
+
+    def invalidate(self, keys: list):
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.incr(self._version_key(key))
+            pipe.expire(self._version_key(key), self.version_ttl)
+        pipe.unlink(*[self._value_key(key) for key in keys])
+        pipe.execute()
+
+    def clear(self):
+        batch = []
+        for key in self.client.scan_iter(match=f"{self.prefix}*", count=500):
+            batch.append(key)
+            if len(batch) == 500:
+                self.client.unlink(*batch)
+                batch = []
+        if batch:
+            self.client.unlink(*batch)
+
+
+class Cache:
+    """Read-through кэш с защитой от одновременного перестроения ключа и счётчиками попаданий.
+    Ошибки бэкенда не прерывают запрос: данные загружаются напрямую из БД.
+    После неудачной инвалидации кэш считается ненадёжным, пока не истекут
+    все записи, которые могли остаться устаревшими (см. invalidation_failed_recently)."""
+
+    def __init__(self, backend, ttl: int = CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._invalidation_failed_until = 0.0
+        self._stats_lock = threading.Lock()
+        self._key_locks = {}
+        self._key_locks_lock = threading.Lock()
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def _lock_for(self, key: str):
+        with self._key_locks_lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = [threading.Lock(), 0]
+            lock[1] += 1
+            return lock
+
+    def _release(self, key: str, lock):
+        with self._key_locks_lock:
+            lock[1] -= 1
+            if lock[1] == 0:
+                self._key_locks.pop(key, None)
+
+    def _get_many(self, keys: list):
+        try:
+            return dict(zip(keys, self.backend.get_many(keys)))
+        except Exception:
+            logger.warning("Ошибка чтения из кэша, данные загружаются из БД", exc_info=True)
+            return {key: (MISSING, None) for key in keys}
+
+    def _set_many(self, items: dict, ttl: int):
+        items = {key: item for key, item in items.items() if item[1] is not None}
+        if not items:
+            return
+        # Разброс TTL, чтобы ключи, записанные одновременно, не истекали разом
+        ttl = ttl + random.randint(0, max(ttl // 10, 1))
+        try:
+            self.backend.set_many(items, ttl)
+        except Exception:
+            logger.warning("Ошибка записи в кэш", exc_info=True)
+
+    def get_or_load(self, key: str, loader, ttl: int = None):
+        """Возвращает значение из кэша, а при промахе вызывает loader()"""
+        return self.get_or_load_many([key], lambda keys: {key: loader()}, ttl)[0]
+
+    def get_or_load_many(self, keys: list, loader, ttl: int = None):
+        """Возвращает значения для списка ключей за одно обращение к бэкенду.
+        Отсутствующие ключи загружаются одним вызовом loader(missing_keys),
+        который возвращает словарь ключ -> значение (нет ключа — None).
+        Для одного ключа загрузка выполняется только одним потоком,
+        остальные ждут и получают уже загруженное значение."""
+        found = self._get_many(list(dict.fromkeys(keys)))
+        missing = sorted(key for key, (value, _) in found.items() if value is MISSING)
+        self._count("hits", len(found) - len(missing))
+
+        locks = []
+        try:
+            for key in missing:
+                lock = self._lock_for(key)
+                lock[0].acquire()
+                locks.append((key, lock))
+
+            if missing:
+                found.update(self._get_many(missing))
+                still_missing = [key for key in missing if found[key][0] is MISSING]
+                self._count("hits", len(missing) - len(still_missing))
+                if still_missing:
+                    self._count("misses", len(still_missing))
+                    loaded = loader(still_missing)
+                    items = {key: (loaded.get(key), found[key][1]) for key in still_missing}
+                    found.update(items)
+                    self._set_many(items, ttl or self.ttl)
+        finally:
+            for key, lock in reversed(locks):
+                lock[0].release()
+                self._release(key, lock)
+
+        return [found[key][0] for key in keys]
+
+    def invalidate(self, *keys: str):
+        try:
+            self.backend.invalidate(list(keys))
+        except Exception:
+            logger.error("Ошибка инвалидации кэша: %s", keys, exc_info=True)
+            max_ttl = self.ttl + max(self.ttl // 10, 1)
+            self._invalidation_failed_until = time.monotonic() + max_ttl
+        self._count("invalidations", len(keys))
+
+    def invalidation_failed_recently(self):
+        """True, если в кэше этого процесса могут оставаться записи, которые не удалось инвалидировать"""
+        return time.monotonic() < self._invalidation_failed_until
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self._stats_lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
+
+
+def create_backend(url: str):
+    scheme = url.split("://", 1)[0]
+    if scheme == "memory":
+        return LRUBackend()
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisBackend.from_url(url)
+    raise ValueError(f"Неподдерживаемый CACHE_URL: {url}")
+
+
+cache = Cache(create_backend(CACHE_URL))
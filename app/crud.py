@@ -1,6 +1,13 @@
 from sqlalchemy.orm import Session
 
 from .auth import get_password_hash
+from .cache import (
+    CACHE_PERMISSION_TTL,
+    cache,
+    task_key,
+    visible_tasks_key,
+    permission_key
+)
 from .models import Task, User, Permission
 from .schemas import TaskCreate, UserCreate, PermissionCreate
 
@@ -10,6 +17,52 @@ def get_task(db: Session, task_id: int):
     return db.query(Task).filter(Task.id == task_id).first()
 
 
+def task_to_dict(task: Task):
+    return {
+        "id": task.id,
+        "title": task.title,
+        "description": task.description,
+        "completed": task.completed,
+        "owner_id": task.owner_id,
+    }
+
+
+def get_task_cached(db: Session, task_id: int):
+    """Функция получения задачи по ID через кэш (словарь или None)"""
+    def load():
+        task = get_task(db, task_id)
+        return task_to_dict(task) if task else None
+
+    return cache.get_or_load(task_key(task_id), load)
+
+
+def get_visible_task_ids(db: Session, user_id: int):
+    """Функция получения ID собственных и доступных пользователю задач через кэш"""
+    def load():
+        own_ids = db.query(Task.id).filter(Task.owner_id == user_id).all()
+        shared_ids = db.query(Task.id).join(Permission).filter(
+            Permission.user_id == user_id
+        ).all()
+        return [row.id for row in own_ids + shared_ids]
+
+    return cache.get_or_load(visible_tasks_key(user_id), load)
+
+
+def get_visible_tasks(db: Session, user_id: int):
+    """Функция получения собственных и доступных пользователю задач через кэш"""
+    task_ids = get_visible_task_ids(db, user_id)
+    keys = [task_key(task_id) for task_id in task_ids]
+    ids_by_key = dict(zip(keys, task_ids))
+
+    def load(missing_keys):
+        ids = [ids_by_key[key] for key in missing_keys]
+        tasks = db.query(Task).filter(Task.id.in_(ids)).all()
+        return {task_key(task.id): task_to_dict(task) for task in tasks}
+
+    tasks = cache.get_or_load_many(keys, load)
+    return [task for task in tasks if task]
+
+
 def create_task(db: Session, task: TaskCreate, owner_id: int):
     """Функция для создания новой задачи"""
     db_task = Task(
@@ -21,6 +74,7 @@ def create_task(db: Session, task: TaskCreate, owner_id: int):
     db.add(db_task)
     db.commit()
     db.refresh(db_task)
+    cache.invalidate(task_key(db_task.id), visible_tasks_key(owner_id))
     return db_task
 
 
@@ -35,6 +89,7 @@ def update_task(db: Session, task_id: int, task_data: dict):
 
     db.commit()
     db.refresh(db_task)
+    cache.invalidate(task_key(task_id))
     return db_task
 
 
@@ -42,8 +97,19 @@ def delete_task(db: Session, task_id: int):
     """Функция для удаления задачи по ID"""
     db_task = get_task(db, task_id)
     if db_task:
+        owner_id = db_task.owner_id
+        permissions = db.query(Permission).filter(Permission.task_id == task_id).all()
+        shared_user_ids = [permission.user_id for permission in permissions]
+        for permission in permissions:
+            db.delete(permission)
         db.delete(db_task)
         db.commit()
+        cache.invalidate(
+            task_key(task_id),
+            visible_tasks_key(owner_id),
+            *[visible_tasks_key(user_id) for user_id in shared_user_ids],
+            *[permission_key(task_id, user_id) for user_id in shared_user_ids],
+        )
         return db_task
     return None
 
@@ -73,6 +139,10 @@ def create_permission(db: Session, permission: PermissionCreate):
     db.add(db_permission)
     db.commit()
     db.refresh(db_permission)
+    cache.invalidate(
+        permission_key(permission.task_id, permission.user_id),
+        visible_tasks_key(permission.user_id),
+    )
     return db_permission
 
 
@@ -84,11 +154,28 @@ def get_permission(db: Session, task_id: int, user_id: int):
     ).first()
 
 
+def get_permission_cached(db: Session, task_id: int, user_id: int):
+    """Функция получения прав доступа через кэш (словарь или None).
+    Права проверяются при каждом изменении задачи, поэтому живут в кэше недолго,
+    а после неудачной инвалидации читаются напрямую из БД."""
+    def load():
+        permission = get_permission(db, task_id, user_id)
+        if not permission:
+            return None
+        return {"id": permission.id, "can_edit": permission.can_edit}
+
+    if cache.invalidation_failed_recently():
+        return load()
+    return cache.get_or_load(permission_key(task_id, user_id), load, CACHE_PERMISSION_TTL)
+
+
 def delete_permission(db: Session, permission_id: int):
     """Функция удаления прав доступа"""
     permission = db.query(Permission).filter(Permission.id == permission_id).first()
     if permission:
+        task_id, user_id = permission.task_id, permission.user_id
         db.delete(permission)
         db.commit()
+        cache.invalidate(permission_key(task_id, user_id), visible_tasks_key(user_id))
         return True
     return False
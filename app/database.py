@@ -1,22 +1,122 @@
 import os
+import threading
 
-from sqlalchemy import create_engine
+from sqlalchemy import TextClause, create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from dotenv import load_dotenv
 
 
 load_dotenv()
 
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT")
-DB_NAME = os.getenv("DB_NAME")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-64000"))
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))
 
-SQLALCHEMY_DATABASE_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+def get_database_url():
+    """DATABASE_URL, а если он не задан — адрес PostgreSQL из переменных DB_*"""
+    return os.getenv(
+        "DATABASE_URL",
+        f"postgresql+psycopg2://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
+        f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
+    )
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Настройка соединения SQLite: WAL, кэш, mmap и ожидание блокировки"""
+    cursor = dbapi_connection.cursor()
+    # Для базы в памяти SQLite оставляет режим журнала "memory"
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def create_db_engine(url: str):
+    """Создаёт движок SQLAlchemy, для SQLite — с настройками соединения"""
+    parsed_url = make_url(url)
+    if parsed_url.get_backend_name() != "sqlite":
+        return create_engine(parsed_url)
+
+    in_memory = parsed_url.database in (None, "", ":memory:")
+    engine = create_engine(
+        parsed_url,
+        connect_args={
+            "check_same_thread": False,
+            "timeout": SQLITE_BUSY_TIMEOUT / 1000,
+        },
+        poolclass=StaticPool if in_memory else None,
+    )
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+# SQLite допускает только одного писателя. Сессии процесса записывают по очереди:
+# блокировка берётся перед первой записью и отпускается по завершении транзакции,
+# поэтому конкурирующие запросы ждут, а не получают "database is locked".
+# Блокировку берут flush и любые запросы session.execute(), кроме SELECT,
+# в том числе запись через text() (text() с SELECT, PRAGMA или EXPLAIN считается чтением).
+# Запросы через engine.connect() она не охватывает.
+# Блокировка действует только внутри процесса: несколько воркеров
+# по-прежнему ожидают друг друга через busy_timeout.
+sqlite_write_lock = threading.Lock()
+
+
+def _acquire_write_lock(session):
+    if session.info.get("holds_write_lock"):
+        return
+    if not sqlite_write_lock.acquire(timeout=SQLITE_BUSY_TIMEOUT / 1000):
+        raise OperationalError(
+            "acquire sqlite write lock",
+            None,
+            TimeoutError(
+                f"Блокировка записи SQLite не получена за {SQLITE_BUSY_TIMEOUT} мс: "
+                "другая сессия не завершила транзакцию"
+            ),
+        )
+    session.info["holds_write_lock"] = True
+
+
+def _acquire_before_flush(session, flush_context, instances):
+    _acquire_write_lock(session)
+
+
+def _acquire_before_write(orm_execute_state):
+    statement = orm_execute_state.statement
+    if isinstance(statement, TextClause):
+        is_read = statement.text.lstrip().upper().startswith(("SELECT", "PRAGMA", "EXPLAIN"))
+    else:
+        is_read = orm_execute_state.is_select
+    if not is_read:
+        _acquire_write_lock(orm_execute_state.session)
+
+
+def _release_write_lock(session, transaction):
+    if transaction.parent is None and session.info.pop("holds_write_lock", False):
+        sqlite_write_lock.release()
+
+
+def enable_sqlite_write_lock(session_factory):
+    """Включает очередь записи для сессий, созданных session_factory"""
+    event.listen(session_factory, "before_flush", _acquire_before_flush)
+    event.listen(session_factory, "do_orm_execute", _acquire_before_write)
+    event.listen(session_factory, "after_transaction_end", _release_write_lock)
+
+
+SQLALCHEMY_DATABASE_URL = get_database_url()
+IS_SQLITE = make_url(SQLALCHEMY_DATABASE_URL).get_backend_name() == "sqlite"
+
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+if IS_SQLITE:
+    enable_sqlite_write_lock(SessionLocal)
+
 Base = declarative_base()
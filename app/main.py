@@ -4,32 +4,36 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 from contextlib import asynccontextmanager
 
-from .models import Task, Base, User, Permission
+from .models import Base, User, Permission
 from .schemas import UserCreate, UserLogin, TaskCreate, PermissionCreate
 from .crud import (
     create_task,
-    get_task,
+    get_task_cached,
+    get_visible_tasks,
     update_task,
     delete_task,
     create_user,
     get_user,
-    get_permission,
+    get_permission_cached,
     create_permission,
     delete_permission
 )
+from .cache import cache
 from .auth import decode_token, verify_password, create_access_token
-from .database import SessionLocal, engine
+from .database import SessionLocal, engine, IS_SQLITE
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    db_name = "SQLite" if IS_SQLITE else "PostgreSQL"
+    version_query = "SELECT sqlite_version()" if IS_SQLITE else "SELECT version()"
     try:
         with engine.connect() as conn:
-            result = conn.execute(text("SELECT version()"))
+            result = conn.execute(text(version_query))
             db_version = result.scalar()
-            print(f"✅ Подключение к PostgreSQL успешно. Версия: {db_version}")
+            print(f"✅ Подключение к {db_name} успешно. Версия: {db_version}")
     except Exception as e:
-        print(f"❌ Ошибка подключения к PostgreSQL: {e}")
+        print(f"❌ Ошибка подключения к {db_name}: {e}")
         import sys
         sys.exit(1)
 
@@ -111,13 +115,7 @@ def get_tasks(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    own_tasks = db.query(Task).filter(Task.owner_id == current_user.id).all()
-
-    shared_tasks = db.query(Task).join(Permission).filter(
-        Permission.user_id == current_user.id
-    ).all()
-
-    return own_tasks + shared_tasks
+    return get_visible_tasks(db, current_user.id)
 
 
 @app.put("/tasks/{task_id}")
@@ -127,13 +125,13 @@ def update_task_endpoint(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    task = get_task(db, task_id)
+    task = get_task_cached(db, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Задача не найдена")
 
-    if task.owner_id != current_user.id:
-        permission = get_permission(db, task_id, current_user.id)
-        if not permission or not permission.can_edit:
+    if task["owner_id"] != current_user.id:
+        permission = get_permission_cached(db, task_id, current_user.id)
+        if not permission or not permission["can_edit"]:
             raise HTTPException(status_code=403, detail="Нет прав на редактирование")
 
     return update_task(db, task_id, task_data.model_dump())
@@ -145,8 +143,8 @@ def delete_task_endpoint(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    task = get_task(db, task_id)
-    if task and task.owner_id != current_user.id:
+    task = get_task_cached(db, task_id)
+    if task and task["owner_id"] != current_user.id:
         raise HTTPException(status_code=403, detail="Только владелец может удалить")
 
     if not delete_task(db, task_id):
@@ -160,8 +158,8 @@ def create_permission_endpoint(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    task = delet_task(db, permission.task_id)
-    if not task or task.owner_id != current_user.id:
+    task = get_task_cached(db, permission.task_id)
+    if not task or task["owner_id"] != current_user.id:
         raise HTTPException(status_code=403, detail="Только владелец может предоставить права")
 
     return create_permission(db, permission)
@@ -177,9 +175,14 @@ def delete_permission_endpoint(
     if not permission:
         raise HTTPException(status_code=404, detail="Права не найдены")
 
-    task = get_task(db, permission.task_id)
-    if not task or task.owner_id != current_user.id:
+    task = get_task_cached(db, permission.task_id)
+    if not task or task["owner_id"] != current_user.id:
         raise HTTPException(status_code=403, detail="Только владелец может отзвать права")
 
     delete_permission(db, permission_id)
     return {"message": "Права отозваны"}
+
+
+@app.get("/cache/stats")
+def cache_stats(current_user: User = Depends(get_current_user)):
+    return cache.stats()
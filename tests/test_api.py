@@ -4,6 +4,7 @@ from sqlalchemy import text
 from dotenv import load_dotenv
 
 from app.main import app
+from app.cache import cache
 from app.database import SessionLocal, engine, Base
 from app.models import User, Permission
 
@@ -29,6 +30,7 @@ def clean_db():
         db.commit()
     finally:
         db.close()
+    cache.clear()
 
 
 # Фикстура для тестового клиента
@@ -271,3 +273,137 @@ def test_delete_permission(client: TestClient, auth_token: str):
     with SessionLocal() as db:
         permission = db.query(Permission).filter(Permission.id == permission_id).first()
         assert permission is None
+
+
+def register_and_login(client: TestClient, username: str, password: str):
+    """Регистрирует пользователя и возвращает его ID и заголовки авторизации"""
+    client.post("/register", json={"username": username, "password": password})
+    response = client.post("/login", json={"username": username, "password": password})
+    with SessionLocal() as db:
+        user = db.query(User).filter(User.username == username).first()
+    return user.id, {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_revoked_permission_denies_update(client: TestClient, auth_token: str, created_task: dict):
+    """Тест запрета редактирования после отзыва прав"""
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    user2_id, user2_headers = register_and_login(client, "editor", "editor_pass")
+    task_id = created_task["id"]
+
+    perm_response = client.post("/permissions", json={
+        "task_id": task_id,
+        "user_id": user2_id,
+        "can_edit": True
+    }, headers=headers)
+    permission_id = perm_response.json()["id"]
+
+    response = client.put(f"/tasks/{task_id}", json={"title": "Edited"}, headers=user2_headers)
+    assert response.status_code == 200
+
+    client.delete(f"/permissions/{permission_id}", headers=headers)
+
+    response = client.put(f"/tasks/{task_id}", json={"title": "Edited again"}, headers=user2_headers)
+    assert response.status_code == 403
+
+
+def test_revoke_during_cache_outage_denies_update(
+    client: TestClient, auth_token: str, created_task: dict, monkeypatch
+):
+    """Тест запрета редактирования, если инвалидация при отзыве прав не удалась"""
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    user2_id, user2_headers = register_and_login(client, "outage_editor", "editor_pass")
+    task_id = created_task["id"]
+
+    perm_response = client.post("/permissions", json={
+        "task_id": task_id,
+        "user_id": user2_id,
+        "can_edit": True
+    }, headers=headers)
+    response = client.put(f"/tasks/{task_id}", json={"title": "Edited"}, headers=user2_headers)
+    assert response.status_code == 200
+
+    def broken_invalidate(keys):
+        raise ConnectionError("cache is down")
+
+    # Признак сбоя сбрасывается после теста
+    monkeypatch.setattr(cache, "_invalidation_failed_until", 0.0)
+    with monkeypatch.context() as patch:
+        patch.setattr(cache.backend, "invalidate", broken_invalidate)
+        client.delete(f"/permissions/{perm_response.json()['id']}", headers=headers)
+
+    response = client.put(f"/tasks/{task_id}", json={"title": "Edited again"}, headers=user2_headers)
+    assert response.status_code == 403
+
+
+def test_granted_task_visible(client: TestClient, auth_token: str, created_task: dict):
+    """Тест появления задачи в списке после предоставления прав"""
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    user2_id, user2_headers = register_and_login(client, "viewer", "viewer_pass")
+
+    assert client.get("/tasks", headers=user2_headers).json() == []
+
+    client.post("/permissions", json={
+        "task_id": created_task["id"],
+        "user_id": user2_id,
+        "can_edit": False
+    }, headers=headers)
+
+    tasks = client.get("/tasks", headers=user2_headers).json()
+    assert [task["id"] for task in tasks] == [created_task["id"]]
+
+
+def test_updated_task_in_list(client: TestClient, auth_token: str, created_task: dict):
+    """Тест отображения обновлённой задачи в списке"""
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    assert client.get("/tasks", headers=headers).json()[0]["title"] == "Test Task"
+
+    client.put(f"/tasks/{created_task['id']}", json={"title": "Renamed"}, headers=headers)
+
+    assert client.get("/tasks", headers=headers).json()[0]["title"] == "Renamed"
+
+
+def test_create_task_after_not_found(client: TestClient, auth_token: str, created_task: dict):
+    """Тест создания задачи с ID, для которого ранее был получен 404"""
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    next_id = created_task["id"] + 1
+
+    response = client.put(f"/tasks/{next_id}", json={"title": "Missing"}, headers=headers)
+    assert response.status_code == 404
+
+    response = client.post("/tasks", json={"title": "Next Task"}, headers=headers)
+    assert response.json()["id"] == next_id
+
+    response = client.put(f"/tasks/{next_id}", json={"title": "Found"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["title"] == "Found"
+
+
+def test_delete_shared_task(client: TestClient, auth_token: str, created_task: dict):
+    """Тест удаления задачи, к которой предоставлен доступ"""
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    user2_id, user2_headers = register_and_login(client, "shared_viewer", "viewer_pass")
+    task_id = created_task["id"]
+
+    client.post("/permissions", json={
+        "task_id": task_id,
+        "user_id": user2_id,
+        "can_edit": True
+    }, headers=headers)
+    assert len(client.get("/tasks", headers=user2_headers).json()) == 1
+
+    response = client.delete(f"/tasks/{task_id}", headers=headers)
+    assert response.status_code == 200
+
+    assert client.get("/tasks", headers=user2_headers).json() == []
+    with SessionLocal() as db:
+        assert db.query(Permission).filter(Permission.task_id == task_id).first() is None
+
+
+def test_cache_stats_requires_auth(client: TestClient, auth_token: str):
+    """Тест доступа к статистике кэша только для авторизованных пользователей"""
+    assert client.get("/cache/stats").status_code == 401
+
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    response = client.get("/cache/stats", headers=headers)
+    assert response.status_code == 200
+    assert "hit_ratio" in response.json()
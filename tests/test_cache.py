@@ -0,0 +1,245 @@
+import fnmatch
+import threading
+import time
+
+import pytest
+
+from app.cache import Cache, LRUBackend, RedisBackend, create_backend
+
+
+class FakeRedis:
+    """Локальная замена клиента Redis для тестов"""
+
+    def __init__(self):
+        self.data = {}
+        self.calls = []
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, keys):
+        self.calls.append("mget")
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.encode()
+
+    def incr(self, key):
+        value = int(self.data.get(key, 0)) + 1
+        self.data[key] = str(value).encode()
+        return value
+
+    def expire(self, key, seconds):
+        return True
+
+    def unlink(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def scan_iter(self, match, count=None):
+        return [key for key in list(self.data) if fnmatch.fnmatch(key, match)]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    def execute(self):
+        self.client.calls.append("pipeline")
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class BrokenBackend:
+    def get_many(self, keys):
+        raise ConnectionError("redis is down")
+
+    def set_many(self, items, ttl):
+        raise ConnectionError("redis is down")
+
+    def invalidate(self, keys):
+        raise ConnectionError("redis is down")
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    if request.param == "memory":
+        return LRUBackend()
+    return RedisBackend(FakeRedis())
+
+
+def test_lru_eviction():
+    """Тест вытеснения самого старого ключа"""
+    cache = Cache(LRUBackend(max_size=2))
+    cache.get_or_load("a", lambda: 1)
+    cache.get_or_load("b", lambda: 2)
+    cache.get_or_load("a", lambda: 1)
+    cache.get_or_load("c", lambda: 3)
+
+    assert cache.get_or_load("a", lambda: "reloaded") == 1
+    assert cache.get_or_load("b", lambda: "reloaded") == "reloaded"
+
+
+def test_hit_ratio_and_invalidation(backend):
+    """Тест счётчиков попаданий и инвалидации"""
+    cache = Cache(backend)
+    assert cache.get_or_load("task:1", lambda: {"id": 1}) == {"id": 1}
+    assert cache.get_or_load("task:1", lambda: {"id": 2}) == {"id": 1}
+
+    cache.invalidate("task:1")
+    assert cache.get_or_load("task:1", lambda: {"id": 2}) == {"id": 2}
+
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 2,
+        "invalidations": 1,
+        "hit_ratio": 1 / 3,
+    }
+
+
+def test_none_is_cached(backend):
+    """Тест кэширования отсутствующих записей"""
+    calls = []
+    cache = Cache(backend)
+    cache.get_or_load("permission:1:2", lambda: calls.append(1))
+    cache.get_or_load("permission:1:2", lambda: calls.append(1))
+    assert len(calls) == 1
+
+
+def test_get_or_load_many_loads_only_missing(backend):
+    """Тест пакетной загрузки отсутствующих ключей одним вызовом"""
+    cache = Cache(backend)
+    cache.get_or_load("task:1", lambda: {"id": 1})
+    calls = []
+
+    def loader(keys):
+        calls.append(keys)
+        return {"task:2": {"id": 2}}
+
+    values = cache.get_or_load_many(["task:1", "task:2", "task:3", "task:1"], loader)
+
+    assert values == [{"id": 1}, {"id": 2}, None, {"id": 1}]
+    assert calls == [["task:2", "task:3"]]
+    assert cache.get_or_load_many(["task:2", "task:3"], loader) == [{"id": 2}, None]
+    assert len(calls) == 1
+
+
+def test_invalidation_during_load(backend):
+    """Тест инвалидации, выполненной пока значение загружается из БД"""
+    cache = Cache(backend)
+
+    def stale_loader():
+        # Другой запрос изменил данные и инвалидировал ключ до записи в кэш
+        cache.invalidate("permission:1:2")
+        return {"id": 1, "can_edit": True}
+
+    assert cache.get_or_load("permission:1:2", stale_loader) == {"id": 1, "can_edit": True}
+    assert cache.get_or_load("permission:1:2", lambda: None) is None
+
+
+def test_redis_backend_batches_requests():
+    """Тест пакетных запросов к Redis и префикса ключей"""
+    client = FakeRedis()
+    cache = Cache(RedisBackend(client))
+    cache.get_or_load_many(["task:1", "task:2"], lambda keys: {"task:1": {"id": 1}})
+
+    assert set(client.data) == {"todo:task:1", "todo:task:2"}
+    assert client.calls == ["mget", "mget", "pipeline"]
+
+    client.calls.clear()
+    assert cache.get_or_load_many(["task:1", "task:2"], lambda keys: {}) == [{"id": 1}, None]
+    assert client.calls == ["mget"]
+
+
+def test_redis_clear_keeps_foreign_keys():
+    """Тест очистки только ключей приложения"""
+    client = FakeRedis()
+    client.data["other:key"] = b"value"
+    cache = Cache(RedisBackend(client))
+    cache.get_or_load("task:1", lambda: {"id": 1})
+    cache.invalidate("task:2")
+
+    cache.clear()
+
+    assert client.data == {"other:key": b"value"}
+
+
+def test_backend_errors_fall_back_to_loader():
+    """Тест работы без кэша при недоступном бэкенде"""
+    cache = Cache(BrokenBackend())
+    assert cache.get_or_load("task:1", lambda: {"id": 1}) == {"id": 1}
+    assert cache.get_or_load_many(["task:1"], lambda keys: {"task:1": {"id": 1}}) == [{"id": 1}]
+    cache.invalidate("task:1")
+
+
+def test_unsupported_cache_url():
+    """Тест ошибки при неизвестной схеме CACHE_URL"""
+    assert isinstance(create_backend("memory://"), LRUBackend)
+    with pytest.raises(ValueError):
+        create_backend("memcached://localhost:11211")
+
+
+def test_stampede_protection():
+    """Тест однократной загрузки ключа при одновременных запросах"""
+    cache = Cache(LRUBackend())
+    calls = []
+
+    def loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return "value"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_load("key", loader)))
+        for _ in range(10)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["value"] * 10
+
+
+def test_lru_versions_are_bounded():
+    """Тест ограничения числа хранимых версий ключей"""
+    backend = LRUBackend(max_size=10)
+    cache = Cache(backend)
+    for i in range(1000):
+        cache.invalidate(f"task:{i}")
+    assert len(backend._versions) <= 10
+
+    cache.clear()
+    assert len(backend._data) == 0
+    assert len(backend._versions) == 0
+
+
+def test_lru_version_eviction_during_load():
+    """Тест инвалидации во время загрузки, когда версия ключа уже вытеснена"""
+    backend = LRUBackend(max_size=2)
+    cache = Cache(backend)
+
+    def stale_loader():
+        cache.invalidate("permission:1:2")
+        cache.invalidate("task:1", "task:2", "task:3")
+        return {"id": 1, "can_edit": True}
+
+    cache.get_or_load("permission:1:2", stale_loader)
+    assert "permission:1:2" not in backend._versions
+    assert cache.get_or_load("permission:1:2", lambda: None) is None
+
+
+def test_failed_invalidation_is_reported():
+    """Тест признака неудачной инвалидации"""
+    cache = Cache(BrokenBackend())
+    assert not cache.invalidation_failed_recently()
+    cache.invalidate("permission:1:2")
+    assert cache.invalidation_failed_recently()
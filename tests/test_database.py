@@ -0,0 +1,119 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import database
+from app.database import (
+    Base,
+    create_db_engine,
+    enable_sqlite_write_lock,
+    get_database_url,
+    sqlite_write_lock,
+)
+from app.models import User
+
+
+@pytest.fixture
+def sqlite_session(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'todo.db'}")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    enable_sqlite_write_lock(session_factory)
+    yield session_factory
+    engine.dispose()
+
+
+def test_database_url_overrides_db_variables(monkeypatch):
+    """Тест приоритета DATABASE_URL над переменными DB_*"""
+    monkeypatch.setenv("DB_USER", "user")
+    monkeypatch.setenv("DB_PASSWORD", "password")
+    monkeypatch.setenv("DB_HOST", "db")
+    monkeypatch.setenv("DB_PORT", "5432")
+    monkeypatch.setenv("DB_NAME", "todo_db")
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    assert get_database_url() == "postgresql+psycopg2://user:password@db:5432/todo_db"
+
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///./todo.db")
+    assert get_database_url() == "sqlite:///./todo.db"
+
+
+def test_sqlite_pragmas(tmp_path):
+    """Тест настроек соединения SQLite"""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'todo.db'}")
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == database.SQLITE_BUSY_TIMEOUT
+        assert conn.exec_driver_sql("PRAGMA foreign_keys").scalar() == 1
+    engine.dispose()
+
+
+@pytest.mark.parametrize("url", ["sqlite://", "sqlite+pysqlite://", "sqlite+pysqlite:///:memory:"])
+def test_sqlite_memory_uses_static_pool(url):
+    """Тест единого соединения для базы SQLite в памяти"""
+    assert isinstance(create_db_engine(url).pool, StaticPool)
+
+
+def test_concurrent_writes(sqlite_session, monkeypatch):
+    """Тест одновременной записи из нескольких потоков"""
+    monkeypatch.setattr(database, "SQLITE_BUSY_TIMEOUT", 10000)
+
+    def write(worker):
+        with sqlite_session() as db:
+            for i in range(20):
+                db.add(User(username=f"user_{worker}_{i}", password="password"))
+                db.commit()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(write, range(8)))
+
+    with sqlite_session() as db:
+        assert db.query(User).count() == 160
+    assert not sqlite_write_lock.locked()
+
+
+def test_write_lock_released_after_rollback(sqlite_session):
+    """Тест освобождения блокировки после rollback и ошибки при записи"""
+    with sqlite_session() as db:
+        db.add(User(username="first", password="password"))
+        db.flush()
+        assert sqlite_write_lock.locked()
+        db.rollback()
+        assert not sqlite_write_lock.locked()
+
+        db.add(User(username="first", password="password"))
+        db.commit()
+        db.add(User(username="first", password="password"))
+        with pytest.raises(IntegrityError):
+            db.commit()
+        db.rollback()
+        assert not sqlite_write_lock.locked()
+
+
+def test_write_lock_timeout(sqlite_session, monkeypatch):
+    """Тест ошибки вместо зависания, если блокировка удерживается другой сессией"""
+    monkeypatch.setattr(database, "SQLITE_BUSY_TIMEOUT", 100)
+    with sqlite_session() as first, sqlite_session() as second:
+        first.add(User(username="first", password="password"))
+        first.flush()
+
+        second.add(User(username="second", password="password"))
+        with pytest.raises(OperationalError):
+            second.flush()
+    assert not sqlite_write_lock.locked()
+
+
+def test_write_lock_covers_raw_sql(sqlite_session):
+    """Тест блокировки записи для запросов через text()"""
+    with sqlite_session() as db:
+        db.execute(text("SELECT 1"))
+        assert not sqlite_write_lock.locked()
+
+        db.execute(text("DELETE FROM users"))
+        assert sqlite_write_lock.locked()
+        db.commit()
+        assert not sqlite_write_lock.locked()